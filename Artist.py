@@ -2,6 +2,7 @@ import sqlite3
 import pandas as pd
 import matplotlib.pyplot as plt
 import logging
+from Database import get_connection
 from typing import Optional, Tuple
 import numpy as np
 
@@ -19,9 +20,8 @@ def validate_artist(artist_name: str, cursor: sqlite3.Cursor) -> bool:
     Returns:
         bool: True if artist exists, False otherwise
     """
-    cursor.execute("SELECT COUNT(*) FROM Artist WHERE Name = ?", (artist_name,))
-    count = cursor.fetchone()[0]
-    if count == 0:
+    cursor.execute("SELECT 1 FROM Artist WHERE Name = ? LIMIT 1", (artist_name,))
+    if cursor.fetchone() is None:
         logging.warning(f"Artist '{artist_name}' not found in database")
         return False
     return True
@@ -38,7 +38,7 @@ def get_artist_popularity(artist_name: str, db_name: str = "CWDatabase.db") -> O
         Optional[pd.DataFrame]: DataFrame with popularity statistics or None if error
     """
     try:
-        conn = sqlite3.connect(db_name)
+        conn = get_connection(db_name)
         cursor = conn.cursor()
 
         # Validate artist first
@@ -50,53 +50,61 @@ def get_artist_popularity(artist_name: str, db_name: str = "CWDatabase.db") -> O
                     print(f"- {suggestion}")
             return None
 
-        # Get artist's popularity by genre
-        query_artist = """
+        # Get artist's popularity by genre alongside the overall genre popularity
+        query = """
+            WITH ArtistGenre AS (
+                SELECT 
+                    g.Genre,
+                    ROUND(AVG(s.Popularity), 2) as ArtistPopularity,
+                    COUNT(*) as SongCount
+                FROM Song s
+                JOIN Artist a ON s.ArtistID = a.ID
+                JOIN SongGenre sg ON s.ID = sg.SongID
+                JOIN Genre g ON sg.GenreID = g.ID
+                WHERE a.Name = ?
+                GROUP BY g.Genre
+            ),
+            OverallGenre AS (
+                SELECT 
+                    g.Genre,
+                    ROUND(AVG(s.Popularity), 2) as OverallPopularity,
+                    COUNT(*) as TotalSongs
+                FROM Song s
+                JOIN SongGenre sg ON s.ID = sg.SongID
+                JOIN Genre g ON sg.GenreID = g.ID
+                GROUP BY g.Genre
+            )
             SELECT 
-                g.Genre,
-                ROUND(AVG(s.Popularity), 2) as ArtistPopularity,
-                COUNT(*) as SongCount
-            FROM Song s
-            JOIN Artist a ON s.ArtistID = a.ID
-            JOIN SongGenre sg ON s.ID = sg.SongID
-            JOIN Genre g ON sg.GenreID = g.ID
-            WHERE a.Name = ?
-            GROUP BY g.Genre
-        """
-        
-        # Get overall genre popularity
-        query_overall = """
-            SELECT 
-                g.Genre,
-                ROUND(AVG(s.Popularity), 2) as OverallPopularity,
-                COUNT(*) as TotalSongs
-            FROM Song s
-            JOIN SongGenre sg ON s.ID = sg.SongID
-            JOIN Genre g ON sg.GenreID = g.ID
-            GROUP BY g.Genre
+                ag.Genre,
+                ag.ArtistPopularity,
+                ag.SongCount,
+                og.OverallPopularity,
+                og.TotalSongs,
+                ROUND(ag.ArtistPopularity - og.OverallPopularity, 2) as Difference,
+                ag.ArtistPopularity > og.OverallPopularity as AboveMean
+            FROM ArtistGenre ag
+            LEFT JOIN OverallGenre og USING (Genre)
+            ORDER BY ag.ArtistPopularity DESC
         """
 
-        # Execute queries
-        df_artist = pd.read_sql_query(query_artist, conn, params=(artist_name,))
-        df_overall = pd.read_sql_query(query_overall, conn)
-
-        # Merge results
-        df = pd.merge(df_artist, df_overall, on='Genre', how='left')
-        
-        # Calculate difference and highlight
-        df['Difference'] = df['ArtistPopularity'] - df['OverallPopularity']
-        df['AboveMean'] = df['Difference'] > 0
+        # Execute query
+        df = pd.read_sql_query(
+            query, conn, params=(artist_name,),
+            dtype={
+                'Genre': 'string',
+                'ArtistPopularity': 'float64',
+                'SongCount': 'int32',
+                'OverallPopularity': 'float64',
+                'TotalSongs': 'int32',
+                'Difference': 'float64',
+                'AboveMean': 'bool'
+            }
+        )
         
-        # Sort by artist popularity
-        df = df.sort_values('ArtistPopularity', ascending=False)
-        
-        conn.close()
         return df
 
     except Exception as e:
         logging.error(f"Error getting artist popularity: {str(e)}")
-        if 'conn' in locals():
-            conn.close()
         return None
 
 def get_similar_artists(name: str, cursor: sqlite3.Cursor, limit: int = 3) -> list:
@@ -112,15 +120,29 @@ def get_similar_artists(name: str, cursor: sqlite3.Cursor, limit: int = 3) -> li
         list: List of similar artist names
     """
     # Try exact match first
-    cursor.execute("SELECT Name FROM Artist WHERE Name = ?", (name,))
-    exact = cursor.fetchall()
-    if exact:
-        return [row[0] for row in exact]
+    cursor.execute("SELECT Name FROM Artist WHERE Name = ? LIMIT 1", (name,))
+    exact = cursor.fetchone()
+    if exact is not None:
+        return [exact[0]]
     
     # Split name into parts
     name_parts = name.lower().split()
     
-    # Try to find artists with similar name parts
+    # Look up name parts in the trigram index (terms shorter than 3 chars never match)
+    fts_terms = ['"' + part.replace('"', '""') + '"' for part in name_parts if len(part) >= 3]
+    if fts_terms:
+        try:
+            cursor.execute(
+                "SELECT Name FROM ArtistFts WHERE ArtistFts MATCH ? ORDER BY rank LIMIT ?",
+                (" OR ".join(fts_terms), limit)
+            )
+            matches = [row[0] for row in cursor.fetchall()]
+            if matches:
+                return matches
+        except sqlite3.OperationalError as e:
+            logging.warning(f"Full-text artist search unavailable: {str(e)}")
+    
+    # Fall back to finding artists with similar name parts
     placeholders = ' OR '.join(['Name LIKE ?' for _ in name_parts])
     query = f"""
         SELECT Name, COUNT(*) as matches 
@@ -152,18 +174,16 @@ def display_popularity_table(df: pd.DataFrame, artist_name: str):
     display_df = df[['Genre', 'ArtistPopularity', 'OverallPopularity', 'AboveMean']]
     
     # Format numbers and highlight above average
-    for idx, row in display_df.iterrows():
-        artist_pop = row['ArtistPopularity']
-        overall_pop = row['OverallPopularity']
-        is_above = row['AboveMean']
-        
-        formatted_row = [
-            row['Genre'],
-            f"\033[1m{artist_pop:.1f}\033[0m" if is_above else f"{artist_pop:.1f}",
-            f"{overall_pop:.1f}"
-        ]
-        
-        print(f"{formatted_row[0]:<15} {formatted_row[1]:>10} {formatted_row[2]:>15}")
+    bold_open = np.where(display_df['AboveMean'], '\033[1m', '')
+    bold_close = np.where(display_df['AboveMean'], '\033[0m', '')
+    lines = [
+        f"{genre:<15} {bo}{artist_pop:>10.1f}{bc} {overall_pop:>15.1f}"
+        for genre, artist_pop, overall_pop, bo, bc in zip(
+            display_df['Genre'], display_df['ArtistPopularity'],
+            display_df['OverallPopularity'], bold_open, bold_close
+        )
+    ]
+    print('\n'.join(lines))
     
     print("=" * 60)
     print("Note: Bold values indicate above-average popularity")
@@ -176,15 +196,15 @@ def create_popularity_chart(df: pd.DataFrame, artist_name: str):
         df (pd.DataFrame): DataFrame with popularity statistics
         artist_name (str): Name of the artist
     """
-    plt.figure(figsize=(12, 6))
+    plt.figure(num='popularity', figsize=(12, 6), clear=True)
     
     x = np.arange(len(df['Genre']))
     width = 0.35
     
     # Create bars
-    plt.bar(x - width/2, df['ArtistPopularity'], width, label=f"{artist_name}'s Popularity",
+    bars_artist = plt.bar(x - width/2, df['ArtistPopularity'], width, label=f"{artist_name}'s Popularity",
             color=['green' if above else 'lightgreen' for above in df['AboveMean']])
-    plt.bar(x + width/2, df['OverallPopularity'], width, label='Overall Genre Average',
+    bars_overall = plt.bar(x + width/2, df['OverallPopularity'], width, label='Overall Genre Average',
             color='lightgray')
     
     plt.xlabel('Genre')
@@ -194,10 +214,9 @@ def create_popularity_chart(df: pd.DataFrame, artist_name: str):
     plt.legend()
     
     # Add value labels on bars
-    for i, v in enumerate(df['ArtistPopularity']):
-        plt.text(i - width/2, v, f'{v:.1f}', ha='center', va='bottom')
-    for i, v in enumerate(df['OverallPopularity']):
-        plt.text(i + width/2, v, f'{v:.1f}', ha='center', va='bottom')
+    ax = plt.gca()
+    ax.bar_label(bars_artist, fmt='%.1f', padding=2)
+    ax.bar_label(bars_overall, fmt='%.1f', padding=2)
     
     plt.tight_layout()
     plt.show()
@@ -6,6 +6,9 @@ from typing import List, Dict
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# Bound parameters per multi-row INSERT, well under SQLite's variable limit
+INSERT_CHUNK_PARAMS = 4000
+
 def load_and_clean_data(csv_file: str) -> pd.DataFrame:
     """
     Load and clean the song dataset from CSV file.
@@ -19,7 +22,22 @@ def load_and_clean_data(csv_file: str) -> pd.DataFrame:
     try:
         # Load data from csv file
         logging.info(f"Loading data from {csv_file}")
-        dfSongs = pd.read_csv(csv_file)
+        dfSongs = pd.read_csv(
+            csv_file,
+            usecols=['song', 'artist', 'explicit', 'year', 'popularity',
+                     'danceability', 'speechiness', 'duration_ms', 'genre'],
+            dtype={
+                'song': 'string',
+                'artist': 'string',
+                'explicit': 'bool',
+                'popularity': 'float32',
+                'danceability': 'float64',
+                'speechiness': 'float64',
+                'duration_ms': 'int64',
+                'genre': 'string'
+            },
+            engine='c'
+        )
         
         # Convert duration from milliseconds to seconds and round to nearest integer
         dfSongs['duration'] = (dfSongs['duration_ms'] / 1000).round().astype(int)
@@ -39,14 +57,10 @@ def load_and_clean_data(csv_file: str) -> pd.DataFrame:
             logging.info(f"Year {year}: {count} songs")
         
         # Clean genre data: split comma-separated genres and strip whitespace
-        dfSongs['genres'] = dfSongs['genre'].str.split(',').apply(
-            lambda x: [g.strip() for g in x] if isinstance(x, list) else []
-        )
+        genre_lists = dfSongs['genre'].fillna('').str.strip().str.split(r'\s*,\s*', regex=True)
         
         # Remove any empty genres or 'set()'
-        dfSongs['genres'] = dfSongs['genres'].apply(
-            lambda x: [g for g in x if g and g != 'set()']
-        )
+        dfSongs['genres'] = [[g for g in genres if g and g != 'set()'] for genres in genre_lists]
         
         logging.info("Data loading and cleaning completed successfully")
         return dfSongs
@@ -72,16 +86,6 @@ def filter_data(dfSongs: pd.DataFrame) -> pd.DataFrame:
         logging.info(f"Popularity dtype: {dfSongs['popularity'].dtype}")
         logging.info(f"Danceability dtype: {dfSongs['danceability'].dtype}")
         
-        # Log year distribution before filtering
-        year_stats_before = dfSongs['year'].value_counts().sort_index()
-        logging.info("\nYear distribution before filtering:")
-        for year, count in year_stats_before.items():
-            logging.info(f"Year {year}: {count} songs")
-        
-        # Convert popularity to numeric if needed
-        dfSongs['popularity'] = pd.to_numeric(dfSongs['popularity'], errors='coerce')
-        dfSongs['danceability'] = pd.to_numeric(dfSongs['danceability'], errors='coerce')
-        
         # Apply filters with proper null handling
         dfFiltered = dfSongs[
             (dfSongs['popularity'].notna()) & 
@@ -92,28 +96,23 @@ def filter_data(dfSongs: pd.DataFrame) -> pd.DataFrame:
             (dfSongs['speechiness'].between(0.33, 0.66))
         ]
         
-        # Log year distribution after filtering
-        year_stats_after = dfFiltered['year'].value_counts().sort_index()
-        logging.info("\nYear distribution after filtering:")
-        for year, count in year_stats_after.items():
-            logging.info(f"Year {year}: {count} songs")
-            
-        # Log filtering impact per year
-        logging.info("\nFiltering impact per year:")
-        for year in sorted(set(year_stats_before.index)):
-            before = year_stats_before.get(year, 0)
-            after = year_stats_after.get(year, 0)
-            if before > 0:
-                retained = (after / before) * 100
-                logging.info(f"Year {year}: {before} -> {after} songs ({retained:.1f}% retained)")
+        # Log year distribution and filtering impact per year (debug only)
+        if logging.getLogger().isEnabledFor(logging.DEBUG):
+            year_stats_before = dfSongs['year'].value_counts().sort_index()
+            year_stats_after = dfFiltered['year'].value_counts().sort_index()
+            stats = pd.concat(
+                [year_stats_before.rename('before'), year_stats_after.rename('after')],
+                axis=1
+            ).fillna(0).astype(int)
+            stats['retained_pct'] = (stats['after'] / stats['before'] * 100).round(1)
+            logging.debug("\nFiltering impact per year:\n" + stats.to_string())
         
         # Print artists that match the criteria
         print("\nArtists with songs matching the criteria:")
         print("----------------------------------------")
-        matching_artists = dfFiltered['artist'].unique()
-        for artist in sorted(matching_artists):
-            artist_songs = dfFiltered[dfFiltered['artist'] == artist]
-            print(f"{artist}: {len(artist_songs)} matching songs")
+        artist_counts = dfFiltered.groupby('artist', sort=True).size()
+        for artist, count in artist_counts.items():
+            print(f"{artist}: {count} matching songs")
             
         logging.info(f"\nFiltered data from {len(dfSongs)} to {len(dfFiltered)} records")
         return dfFiltered
@@ -122,36 +121,45 @@ def filter_data(dfSongs: pd.DataFrame) -> pd.DataFrame:
         logging.error(f"Error in filter_data: {str(e)}")
         raise
 
-def create_database_schema(cursor: sqlite3.Cursor):
+def create_database_schema(cursor: sqlite3.Cursor) -> bool:
     """
     Create the database schema with proper tables and relationships.
     
+    Opens a transaction (BEGIN) and leaves it open, so the caller commits or
+    rolls back the schema rebuild together with the data load.
+    
     Args:
         cursor (sqlite3.Cursor): Database cursor for executing SQL commands
+        
+    Returns:
+        bool: True if the ArtistFts full-text index was created
     """
-    # Drop existing tables to start fresh
-    tables = ['Song', 'Artist', 'Genre', 'SongGenre']
-    for table in tables:
-        cursor.execute(f"DROP TABLE IF EXISTS {table}")
-    
-    # Create Artist table
-    cursor.execute('''
+    # Drop existing tables (dependents first) and create the schema in one script.
+    # executescript commits any pending transaction first, so the script opens a
+    # new one that stays open for the caller's load (and its rollback).
+    cursor.executescript('''
+        BEGIN;
+        
+        DROP TABLE IF EXISTS ArtistYearStats;
+        DROP TABLE IF EXISTS ArtistFts;
+        DROP TABLE IF EXISTS SongGenre;
+        DROP TABLE IF EXISTS Song;
+        DROP TABLE IF EXISTS Genre;
+        DROP TABLE IF EXISTS Artist;
+        
+        -- Artist table
         CREATE TABLE Artist (
             ID INTEGER PRIMARY KEY AUTOINCREMENT,
             Name TEXT NOT NULL UNIQUE
-        )
-    ''')
-    
-    # Create Genre table
-    cursor.execute('''
+        );
+        
+        -- Genre table
         CREATE TABLE Genre (
             ID INTEGER PRIMARY KEY AUTOINCREMENT,
             Genre TEXT NOT NULL UNIQUE
-        )
-    ''')
-    
-    # Create Song table
-    cursor.execute('''
+        );
+        
+        -- Song table
         CREATE TABLE Song (
             ID INTEGER PRIMARY KEY AUTOINCREMENT,
             Title TEXT NOT NULL,
@@ -163,19 +171,91 @@ def create_database_schema(cursor: sqlite3.Cursor):
             Speechiness FLOAT NOT NULL,
             ArtistID INTEGER NOT NULL,
             FOREIGN KEY (ArtistID) REFERENCES Artist(ID)
-        )
-    ''')
-    
-    # Create SongGenre junction table for many-to-many relationship
-    cursor.execute('''
+        );
+        
+        -- SongGenre junction table for many-to-many relationship
         CREATE TABLE SongGenre (
             SongID INTEGER,
             GenreID INTEGER,
             PRIMARY KEY (SongID, GenreID),
             FOREIGN KEY (SongID) REFERENCES Song(ID),
             FOREIGN KEY (GenreID) REFERENCES Genre(ID)
-        )
+        ) WITHOUT ROWID;
+        
+        -- Per-artist, per-year summary used by the Top 5 ranking, clustered by year
+        CREATE TABLE ArtistYearStats (
+            Artist TEXT NOT NULL,
+            Year INTEGER NOT NULL,
+            NumSongs INTEGER NOT NULL,
+            AvgPopularity FLOAT NOT NULL,
+            PRIMARY KEY (Year, Artist)
+        ) WITHOUT ROWID;
+        
+        -- Indexes for the filter and join columns used by the analysis scripts.
+        -- Song(Year, ArtistID, Popularity) also covers the per-year artist aggregates.
+        -- SongGenre(SongID) is already covered by the leading primary key column.
+        CREATE INDEX idx_song_year_artist_pop ON Song(Year, ArtistID, Popularity);
+        CREATE INDEX idx_song_artist ON Song(ArtistID);
+        CREATE INDEX idx_artist_name_nocase ON Artist(Name COLLATE NOCASE);
+        CREATE INDEX idx_sg_genre ON SongGenre(GenreID);
     ''')
+    
+    # Trigram full-text index over artist names for fuzzy lookups, created inside the
+    # transaction opened above; optional, since FTS5 and the trigram tokenizer are
+    # not available in every SQLite build
+    try:
+        cursor.execute('''
+            CREATE VIRTUAL TABLE ArtistFts USING fts5(
+                Name,
+                content='Artist',
+                content_rowid='ID',
+                tokenize='trigram'
+            )
+        ''')
+    except sqlite3.OperationalError as e:
+        logging.warning(f"Full-text artist search unavailable: {str(e)}")
+        return False
+    return True
+
+def precompute_artist_year_stats(cursor: sqlite3.Cursor):
+    """
+    Materialize per-artist, per-year song counts and average popularity.
+    
+    Args:
+        cursor (sqlite3.Cursor): Database cursor for executing SQL commands
+    """
+    cursor.execute('''
+        INSERT INTO ArtistYearStats (Artist, Year, NumSongs, AvgPopularity)
+        SELECT a.Name, s.Year, COUNT(*), AVG(s.Popularity)
+        FROM Song s
+        JOIN Artist a ON s.ArtistID = a.ID
+        GROUP BY a.Name, s.Year
+    ''')
+
+def stage_dataframe(df: pd.DataFrame, table: str, cursor: sqlite3.Cursor):
+    """
+    Write a DataFrame to a temporary staging table using chunked multi-row INSERT statements.
+    
+    The inserts run on the caller's cursor, so they take part in its open transaction.
+    
+    Args:
+        df (pd.DataFrame): Data to stage
+        table (str): Name of the temporary staging table (replaced if it exists)
+        cursor (sqlite3.Cursor): Database cursor for executing SQL commands
+    """
+    columns = list(df.columns)
+    cursor.execute(f"DROP TABLE IF EXISTS temp.{table}")
+    cursor.execute(f"CREATE TEMP TABLE {table} ({', '.join(columns)})")
+    
+    rows = list(df.itertuples(index=False, name=None))
+    row_placeholders = '(' + ', '.join(['?'] * len(columns)) + ')'
+    chunk_rows = max(1, INSERT_CHUNK_PARAMS // len(columns))
+    for start in range(0, len(rows), chunk_rows):
+        chunk = rows[start:start + chunk_rows]
+        cursor.execute(
+            f"INSERT INTO {table} VALUES " + ', '.join([row_placeholders] * len(chunk)),
+            [value for row in chunk for value in row]
+        )
 
 def create_and_populate_database(df: pd.DataFrame, db_name: str = "CWDatabase.db"):
     """
@@ -189,61 +269,84 @@ def create_and_populate_database(df: pd.DataFrame, db_name: str = "CWDatabase.db
         conn = sqlite3.connect(db_name)
         cursor = conn.cursor()
         
-        # Create database schema
-        create_database_schema(cursor)
-        
-        # Insert unique artists and create mapping
-        unique_artists = df['artist'].unique()
-        artist_id_map = {}
-        for artist in unique_artists:
-            cursor.execute("INSERT INTO Artist (Name) VALUES (?)", (artist,))
-            artist_id_map[artist] = cursor.lastrowid
-        
-        # Insert unique genres and create mapping
-        unique_genres = set()
-        for genres in df['genres']:
-            unique_genres.update(genres)
-        
-        genre_id_map = {}
-        for genre in unique_genres:
-            cursor.execute("INSERT INTO Genre (Genre) VALUES (?)", (genre,))
-            genre_id_map[genre] = cursor.lastrowid
+        # Bulk-load friendly settings, applied once before the transaction
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA temp_store=MEMORY")
         
-        # Prepare and insert song data
-        for _, row in df.iterrows():
-            # Insert song
+        # Run the schema rebuild and data load in a single transaction: the schema
+        # script issues BEGIN, and 'with conn' commits, or rolls back on error so
+        # the previous database is left intact
+        with conn:
+            # Create database schema (opens the transaction)
+            has_fts = create_database_schema(cursor)
+            
+            # Stage unique artists and let SQLite assign their IDs
+            stage_dataframe(df[['artist']].drop_duplicates(), 'Artist_stage', cursor)
+            cursor.execute("INSERT INTO Artist (Name) SELECT artist FROM Artist_stage")
+            if has_fts:
+                cursor.execute("INSERT INTO ArtistFts(ArtistFts) VALUES ('rebuild')")
+            
+            # Assign song IDs up front so genre edges can reference them
+            df_songs = df[['song', 'duration', 'explicit', 'year', 'popularity',
+                           'danceability', 'speechiness', 'artist', 'genres']].copy()
+            df_songs.insert(0, 'song_id', range(1, len(df_songs) + 1))
+            
+            # Flatten song-genre edges once; unique genres come from the same frame
+            df_song_genres = df_songs[['song_id', 'genres']].explode('genres').dropna()
+            unique_genres = pd.Series(df_song_genres['genres'].unique(), name='genres')
+            
+            # Stage unique genres
+            stage_dataframe(unique_genres.to_frame(), 'Genre_stage', cursor)
+            cursor.execute("INSERT INTO Genre (Genre) SELECT genres FROM Genre_stage")
+            
+            # Stage songs
+            stage_dataframe(df_songs.drop(columns=['genres']), 'Song_stage', cursor)
+            
+            # Insert songs, resolving artist IDs with a join
             cursor.execute('''
-                INSERT INTO Song (Title, Duration, Explicit, Year, Popularity, 
+                INSERT INTO Song (ID, Title, Duration, Explicit, Year, Popularity, 
                                 Danceability, Speechiness, ArtistID)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                row['song'],
-                row['duration'],
-                row['explicit'],
-                row['year'],
-                row['popularity'],
-                row['danceability'],
-                row['speechiness'],
-                artist_id_map[row['artist']]
-            ))
-            song_id = cursor.lastrowid
+                SELECT st.song_id, st.song, st.duration, st.explicit, st.year,
+                       st.popularity, st.danceability, st.speechiness, a.ID
+                FROM Song_stage st
+                JOIN Artist a ON a.Name = st.artist
+                ORDER BY st.song_id
+            ''')
+            
+            # Insert song-genre relationships, resolving genre IDs with a join
+            stage_dataframe(df_song_genres, 'SongGenre_stage', cursor)
+            cursor.execute('''
+                INSERT INTO SongGenre (SongID, GenreID)
+                SELECT sgs.song_id, g.ID
+                FROM SongGenre_stage sgs
+                JOIN Genre g ON g.Genre = sgs.genres
+            ''')
             
-            # Insert song-genre relationships
-            for genre in row['genres']:
-                cursor.execute('''
-                    INSERT INTO SongGenre (SongID, GenreID)
-                    VALUES (?, ?)
-                ''', (song_id, genre_id_map[genre]))
+            # Materialize the summary table used by the Top 5 analysis
+            precompute_artist_year_stats(cursor)
+            
+            # Remove staging tables and refresh planner statistics so the new indexes are used.
+            # Separate statements, since executescript would commit the open transaction.
+            for table in ['Artist_stage', 'Genre_stage', 'Song_stage', 'SongGenre_stage']:
+                cursor.execute(f"DROP TABLE temp.{table}")
+            cursor.execute("ANALYZE")
         
-        conn.commit()
-        conn.close()
         logging.info(f"Database {db_name} created and populated successfully")
         
     except Exception as e:
         logging.error(f"Error in create_and_populate_database: {str(e)}")
+        raise
+    
+    finally:
         if 'conn' in locals():
+            # The database is read-only after the load, so leave it as a single file
+            # without -wal/-shm companions, whether or not the load succeeded
+            try:
+                conn.execute("PRAGMA journal_mode=DELETE")
+            except sqlite3.OperationalError as e:
+                logging.warning(f"Could not leave WAL mode: {str(e)}")
             conn.close()
-        raise
 
 def main():
     """
@@ -0,0 +1,19 @@
+import sqlite3
+import functools
+
+@functools.lru_cache(maxsize=4)
+def get_connection(db_name: str) -> sqlite3.Connection:
+    """
+    Get a cached database connection so repeated queries reuse a warm page cache.
+    
+    Args:
+        db_name (str): Database file name
+        
+    Returns:
+        sqlite3.Connection: Shared connection for the database file
+    """
+    conn = sqlite3.connect(db_name, check_same_thread=False)
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-65536")
+    conn.execute("PRAGMA mmap_size=268435456")
+    return conn
@@ -1,12 +1,16 @@
-import sqlite3
+import functools
 import pandas as pd
 import matplotlib.pyplot as plt
 from typing import Optional
 import logging
+from Database import get_connection
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# Years covered by the dataset
+_VALID_YEARS = frozenset(range(1998, 2021))
+
 def validate_year(year: int) -> bool:
     """
     Validate if the input year is within the valid range.
@@ -18,13 +22,8 @@ def validate_year(year: int) -> bool:
         bool: True if year is valid, False otherwise
     """
     try:
-        year_int = int(year)
-        is_valid = 1998 <= year_int <= 2020
-        if not is_valid:
-            logging.warning(f"Year {year} is outside valid range (1998-2020)")
-        return is_valid
+        return int(year) in _VALID_YEARS
     except (ValueError, TypeError):
-        logging.error(f"Invalid year value: {year}")
         return False
 
 def check_database_years(db_name: str = "CWDatabase.db") -> None:
@@ -35,7 +34,7 @@ def check_database_years(db_name: str = "CWDatabase.db") -> None:
         db_name (str): Database file name
     """
     try:
-        conn = sqlite3.connect(db_name)
+        conn = get_connection(db_name)
         cursor = conn.cursor()
         
         # Check all distinct years
@@ -59,12 +58,51 @@ def check_database_years(db_name: str = "CWDatabase.db") -> None:
         for year, count in counts:
             print(f"Year {year}: {count} songs")
             
-        conn.close()
-        
     except Exception as e:
         logging.error(f"Database diagnostic error: {str(e)}")
-        if 'conn' in locals():
-            conn.close()
+
+@functools.lru_cache(maxsize=32)
+def _get_genre_statistics_cached(year: int, db_name: str, data_version: int) -> pd.DataFrame:
+    """
+    Run the genre statistics query for a year, memoized per database state.
+    
+    Args:
+        year (int): Year to analyze
+        db_name (str): Database file name
+        data_version (int): SQLite data_version, which changes whenever the database is rewritten
+        
+    Returns:
+        pd.DataFrame: Genre statistics for the year (callers must not mutate it)
+    """
+    conn = get_connection(db_name)
+    
+    query = """
+        SELECT 
+            g.Genre,
+            ROUND(AVG(s.Danceability), 3) as AvgDanceability,
+            ROUND(AVG(s.Popularity), 1) as AvgPopularity,
+            ROUND(AVG(s.Speechiness), 3) as AvgSpeechiness,
+            COUNT(*) as SongCount,
+            ROUND(COUNT(*) * 100.0 / SUM(COUNT(*)) OVER (), 1) as Percentage
+        FROM Song s
+        JOIN SongGenre sg ON s.ID = sg.SongID
+        JOIN Genre g ON sg.GenreID = g.ID
+        WHERE s.Year = ?
+        GROUP BY g.Genre
+        ORDER BY SongCount DESC;
+    """
+    
+    return pd.read_sql_query(
+        query, conn, params=(year,),
+        dtype={
+            'Genre': 'string',
+            'AvgDanceability': 'float32',
+            'AvgPopularity': 'float32',
+            'AvgSpeechiness': 'float32',
+            'SongCount': 'int32',
+            'Percentage': 'float32'
+        }
+    )
 
 def get_genre_statistics(year: int, db_name: str = "CWDatabase.db", debug: bool = False, min_songs: int = 10) -> Optional[pd.DataFrame]:
     """
@@ -83,7 +121,7 @@ def get_genre_statistics(year: int, db_name: str = "CWDatabase.db", debug: bool
             logging.error(f"Invalid year provided: {year}")
             return None
             
-        conn = sqlite3.connect(db_name)
+        conn = get_connection(db_name)
         cursor = conn.cursor()
         
         # Check total song count for the year
@@ -163,33 +201,9 @@ def get_genre_statistics(year: int, db_name: str = "CWDatabase.db", debug: bool
                 for title, artist, popularity in samples:
                     logging.info(f"- {title} by {artist} (Popularity: {popularity})")
         
-        query = """
-            WITH GenreSongs AS (
-                SELECT 
-                    g.Genre,
-                    s.Danceability,
-                    s.Popularity,
-                    s.Speechiness,
-                    COUNT(*) OVER (PARTITION BY g.Genre) as TotalSongs
-                FROM Song s
-                JOIN SongGenre sg ON s.ID = sg.SongID
-                JOIN Genre g ON sg.GenreID = g.ID
-                WHERE s.Year = ?
-            )
-            SELECT 
-                Genre,
-                ROUND(AVG(Danceability), 3) as AvgDanceability,
-                ROUND(AVG(Popularity), 1) as AvgPopularity,
-                ROUND(AVG(Speechiness), 3) as AvgSpeechiness,
-                COUNT(*) as SongCount,
-                ROUND(COUNT(*) * 100.0 / SUM(COUNT(*)) OVER (), 1) as Percentage
-            FROM GenreSongs
-            GROUP BY Genre
-            ORDER BY SongCount DESC;
-        """
-        
-        df = pd.read_sql_query(query, conn, params=(year,))
-        conn.close()
+        # Reuse the cached result unless the database has changed since it was computed
+        data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+        df = _get_genre_statistics_cached(year, db_name, data_version).copy()
         
         return df if not df.empty else None
         
@@ -231,9 +245,11 @@ def create_visualizations(df: pd.DataFrame, year: int):
         year (int): Year being analyzed
     """
     
-    # Pie chart for song distribution by genres
-    plt.pie(df['SongCount'], labels=df['Genre'], autopct='%1.1f%%', 
-            startangle=90)
+    plt.figure(num='genre_distribution', clear=True)
+    
+    # Pie chart for song distribution by genres, labelled with precomputed percentages
+    labels = [f"{genre} {pct:.1f}%" for genre, pct in zip(df['Genre'], df['Percentage'])]
+    plt.pie(df['SongCount'], labels=labels, startangle=90)
     plt.title(f'Song Distribution by Genre ({year})')
     plt.legend()
     plt.tight_layout()
@@ -1,7 +1,7 @@
-import sqlite3
 import pandas as pd
 import matplotlib.pyplot as plt
 import logging
+from Database import get_connection
 from typing import Optional, Tuple, Dict
 import numpy as np
 
@@ -10,6 +10,8 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 
 class RankingWeights:
     """Class to hold and validate ranking weights"""
+    __slots__ = ('song_weight', 'popularity_weight')
+    
     def __init__(self, song_weight: float = 0.4, popularity_weight: float = 0.6):
         """
         Initialize ranking weights.
@@ -18,7 +20,7 @@ class RankingWeights:
             song_weight (float): Weight for number of songs (default: 0.4)
             popularity_weight (float): Weight for popularity (default: 0.6)
         """
-        if not np.isclose(song_weight + popularity_weight, 1.0):
+        if abs(song_weight + popularity_weight - 1.0) > 1e-9:
             raise ValueError("Weights must sum to 1.0")
         self.song_weight = song_weight
         self.popularity_weight = popularity_weight
@@ -91,68 +93,105 @@ def get_top_artists(start_year: int, end_year: int, weights: RankingWeights,
         Optional[Tuple[pd.DataFrame, pd.DataFrame]]: Tuple of (yearly_data, summary_data) or None if error
     """
     try:
-        conn = sqlite3.connect(db_name)
+        conn = get_connection(db_name)
         
-        # Get artist statistics by year
-        query = """
-            SELECT 
-                a.Name as Artist,
-                s.Year,
-                COUNT(*) as NumSongs,
-                ROUND(AVG(s.Popularity), 2) as AvgPopularity
-            FROM Song s
-            JOIN Artist a ON s.ArtistID = a.ID
-            WHERE s.Year BETWEEN ? AND ?
-            GROUP BY a.Name, s.Year
-            HAVING NumSongs > 0
-            ORDER BY s.Year, NumSongs DESC
+        # Per-year statistics and ranking values from the ArtistYearStats summary
+        # built during preprocessing, rolled up to the top 5 artists
+        # (RankValue mirrors calculate_ranking_value, computed inside SQLite)
+        ranking_ctes = """
+            WITH PerYear AS (
+                SELECT 
+                    Artist,
+                    Year,
+                    NumSongs,
+                    ROUND(AvgPopularity, 2) as AvgPopularity,
+                    (? * MIN(NumSongs, 100) + ? * ROUND(AvgPopularity, 2)) as RankValue
+                FROM ArtistYearStats
+                WHERE Year BETWEEN ? AND ?
+            ),
+            TopArtists AS (
+                SELECT 
+                    Artist,
+                    SUM(RankValue) as RankValue,
+                    SUM(NumSongs) as NumSongs,
+                    AVG(AvgPopularity) as AvgPopularity
+                FROM PerYear
+                GROUP BY Artist
+                ORDER BY RankValue DESC, Artist
+                LIMIT 5
+            )
         """
+        params = (weights.song_weight, weights.popularity_weight, start_year, end_year)
         
-        df = pd.read_sql_query(query, conn, params=(start_year, end_year))
+        # Get summary statistics for the top 5 artists
+        top_artists = pd.read_sql_query(
+            ranking_ctes + "SELECT * FROM TopArtists ORDER BY RankValue DESC, Artist",
+            conn, params=params,
+            dtype={'NumSongs': np.int32, 'AvgPopularity': np.float64, 'RankValue': np.float64}
+        ).set_index('Artist')
         
-        if df.empty:
+        if top_artists.empty:
             logging.warning(f"No data found for years {start_year}-{end_year}")
-            conn.close()
             return None
-            
-        # Calculate ranking values
-        df['RankValue'] = df.apply(
-            lambda row: calculate_ranking_value(
-                row['NumSongs'], 
-                row['AvgPopularity'],
-                weights
-            ),
-            axis=1
-        )
-        
-        # Get top 5 artists based on total ranking value
-        top_artists = df.groupby('Artist').agg({
-            'RankValue': 'sum',
-            'NumSongs': 'sum',
-            'AvgPopularity': 'mean'
-        }).sort_values('RankValue', ascending=False).head(5)
         
-        # Create yearly breakdown for top artists
-        yearly_data = pd.pivot_table(
-            df[df['Artist'].isin(top_artists.index)],
-            values='RankValue',
-            index='Artist',
-            columns='Year',
-            fill_value=None
+        # Get the yearly breakdown rows for those artists
+        df = pd.read_sql_query(
+            ranking_ctes + """
+            SELECT PerYear.Artist, PerYear.Year, PerYear.RankValue
+            FROM PerYear
+            JOIN TopArtists USING (Artist)
+            """,
+            conn, params=params,
+            dtype={'Year': np.int16, 'RankValue': np.float64}
         )
         
+        # Create yearly breakdown for top artists ((Artist, Year) is unique, so just reshape)
+        yearly_data = df.set_index(['Artist', 'Year'])['RankValue'].unstack()
+        
         # Add average row
-        yearly_data.loc['Average'] = yearly_data.mean()
+        yearly_data.loc['Average'] = yearly_data.mean(axis=0)
         
-        conn.close()
         return yearly_data, top_artists
         
     except Exception as e:
         logging.error(f"Database error: {str(e)}")
-        if 'conn' in locals():
-            conn.close()
         return None
 
+# Successful get_top_artists results keyed by (start, end, weights, db_name, data_version)
+_TOP_ARTISTS_CACHE: Dict[tuple, Tuple[pd.DataFrame, pd.DataFrame]] = {}
+_TOP_ARTISTS_CACHE_SIZE = 32
+
+def _cached_top_artists(start_year: int, end_year: int, weights: RankingWeights,
+                        db_name: str = "CWDatabase.db") -> Optional[Tuple[pd.DataFrame, pd.DataFrame]]:
+    """
+    Memoized wrapper around get_top_artists.
+    
+    The SQLite data_version is part of the cache key so results are recomputed
+    after preprocessing rewrites the database. Failed lookups (None) are not
+    cached. Callers must not mutate the returned DataFrames.
+    
+    Args:
+        start_year (int): Start year
+        end_year (int): End year
+        weights (RankingWeights): Ranking weights configuration
+        db_name (str): Database file name
+        
+    Returns:
+        Optional[Tuple[pd.DataFrame, pd.DataFrame]]: Result of get_top_artists
+    """
+    data_version = get_connection(db_name).execute("PRAGMA data_version").fetchone()[0]
+    key = (start_year, end_year, weights.song_weight, weights.popularity_weight, db_name, data_version)
+    if key in _TOP_ARTISTS_CACHE:
+        return _TOP_ARTISTS_CACHE[key]
+    
+    result = get_top_artists(start_year, end_year, weights, db_name)
+    if result is not None:
+        if len(_TOP_ARTISTS_CACHE) >= _TOP_ARTISTS_CACHE_SIZE:
+            # Evict the oldest entry
+            del _TOP_ARTISTS_CACHE[next(iter(_TOP_ARTISTS_CACHE))]
+        _TOP_ARTISTS_CACHE[key] = result
+    return result
+
 def display_rankings_table(yearly_data: pd.DataFrame, top_artists: pd.DataFrame):
     """
     Display formatted rankings table with highlighting.
@@ -164,15 +203,14 @@ def display_rankings_table(yearly_data: pd.DataFrame, top_artists: pd.DataFrame)
     print("\nTop Artists Table:")
     print("=" * 80)
     
-    # Format table with highlighting
-    display_df = yearly_data.copy()
-    
-    # Highlight maximum values in each year
-    for col in display_df.columns:
-        max_val = display_df[col].max()
-        display_df[col] = display_df[col].apply(
-            lambda x: f"\033[1m{x:.1f}\033[0m" if x == max_val else f"{x:.1f}" if pd.notnull(x) else "Null"
-        )
+    # Format values and highlight maximum values in each year
+    arr = yearly_data.to_numpy(dtype=float)
+    col_max = yearly_data.max(axis=0).to_numpy(dtype=float)
+    nulls = np.isnan(arr)
+    is_max = arr == col_max
+    strs = np.where(nulls, 'Null', np.char.mod('%.1f', np.nan_to_num(arr)))
+    strs = np.where(is_max & ~nulls, np.char.add('\033[1m', np.char.add(strs, '\033[0m')), strs)
+    display_df = pd.DataFrame(strs, index=yearly_data.index, columns=yearly_data.columns)
     
     # Add overall statistics
     display_df['Total Songs'] = top_artists['NumSongs']
@@ -191,22 +229,16 @@ def create_visualization(yearly_data: pd.DataFrame, start_year: int, end_year: i
         start_year (int): Start year
         end_year (int): End year
     """
-    plt.figure(figsize=(12, 6))
+    plt.figure(num='top_artists', figsize=(12, 6), clear=True)
     
-    # Plot individual artist lines
+    # Plot individual artist lines, skipping years without data
     for artist in yearly_data.index[:-1]:  # Exclude Average row
-        data = yearly_data.loc[artist]
-        years = [year for year in range(start_year, end_year + 1) 
-                if year in yearly_data.columns and pd.notnull(data[year])]
-        values = [data[year] for year in years]
-        plt.plot(years, values, marker='o', label=artist, linewidth=2)
+        data = yearly_data.loc[artist].dropna()
+        plt.plot(data.index.to_numpy(), data.to_numpy(), marker='o', label=artist, linewidth=2)
     
     # Plot average line
-    avg_data = yearly_data.loc['Average']
-    years = [year for year in range(start_year, end_year + 1) 
-            if year in yearly_data.columns and pd.notnull(avg_data[year])]
-    values = [avg_data[year] for year in years]
-    plt.plot(years, values, 'k--', label='Average', linewidth=2)
+    avg_data = yearly_data.loc['Average'].dropna()
+    plt.plot(avg_data.index.to_numpy(), avg_data.to_numpy(), 'k--', label='Average', linewidth=2)
     
     plt.title(f"Artist Rankings Over Time ({start_year}-{end_year})")
     plt.xlabel("Year")
@@ -214,7 +246,13 @@ def create_visualization(yearly_data: pd.DataFrame, start_year: int, end_year: i
     plt.legend(bbox_to_anchor=(1.05, 1), loc='upper left')
     plt.grid(True, linestyle='--', alpha=0.7)
     plt.tight_layout()
-    plt.show()
+    
+    # Headless (Agg) backends cannot show a window, so write the chart to a file instead
+    if plt.get_backend().lower() == 'agg':
+        plt.savefig(f'top_artists_{start_year}_{end_year}.png', dpi=100, bbox_inches='tight')
+        plt.close()
+    else:
+        plt.show()
 
 def analyze_top_artists(start_year: int, end_year: int) -> bool:
     """
@@ -236,7 +274,7 @@ def analyze_top_artists(start_year: int, end_year: int) -> bool:
         weights = RankingWeights()
         
         # Get and display results
-        result = get_top_artists(start_year, end_year, weights)
+        result = _cached_top_artists(start_year, end_year, weights)
         
         if result is not None:
             yearly_data, top_artists = result